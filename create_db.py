@@ -1,9 +1,31 @@
 import os
+import re
+import math
 import json
 import sqlite3
 import glob
+import struct
+from array import array
+import threading
+import multiprocessing
+import numpy as np
+import shapely
+from shapely.errors import GEOSException
 from shapely.geometry import shape, MultiPolygon, Polygon
-from shapely.wkb import dumps as wkb_dumps
+import boundary_codec
+
+# orjson opsional: parsing GeoJSON (mayoritas array koordinat) jauh lebih cepat
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# numba opsional: Douglas-Peucker langsung di array koordinat tanpa GEOS
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # Konfigurasi
 DB_FILE = "indonesia_area.db"
@@ -11,8 +33,20 @@ DB_FILE = "indonesia_area.db"
 # 20 meter = ~0.00018 derajat (dibulatkan 0.0002)
 SIMPLIFY_TOLERANCE = 0.0002
 DATA_DIR = "./data"
+# Jumlah file yang diproses sekaligus oleh satu worker
+BATCH_SIZE = 256
+# Format kolom boundaries: 'wkb' (dibaca oleh server API) atau 'qdelta'
+# (int32 terkuantisasi + delta, ~setengah ukuran WKB, lihat boundary_codec.py).
+# Server API saat ini hanya bisa membaca 'wkb'.
+BOUNDARY_FORMAT = 'wkb'
+# Resolusi grid kurva Hilbert untuk urutan pengisian R*Tree
+HILBERT_ORDER = 16
+# Penanda akhir antrean hasil worker
+SENTINEL = None
+# Urutan 6 nilai float per baris di batch (SoA)
+COORD_FIELDS = ('lat', 'lng', 'min_lat', 'max_lat', 'min_lng', 'max_lng')
 
-def init_db(conn):
+def init_db_tables(conn):
     cursor = conn.cursor()
     
     # Buat tabel provinces
@@ -81,142 +115,558 @@ def init_db(conn):
     )
     ''')
     
-    # Create indexes for spatial queries
+    # R*Tree untuk pencarian bounding box. Id R*Tree harus integer,
+    # jadi yang disimpan adalah rowid dari tabel level-nya
+    for table_name in ('provinces', 'regencies', 'districts', 'villages'):
+        cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {table_name}_rtree
+        USING rtree(id, min_lat, max_lat, min_lng, max_lng)
+        ''')
+    
+    conn.commit()
+
+def create_indexes(conn):
+    # Dibuat setelah semua data masuk: satu kali build per index jauh lebih
+    # cepat daripada update index untuk setiap baris yang di-insert
+    cursor = conn.cursor()
+    
+    # Create indexes for spatial queries (bounding box memakai R*Tree)
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_villages_lat_lng ON villages(lat, lng)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_villages_bbox ON villages(min_lat, max_lat, min_lng, max_lng)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_districts_lat_lng ON districts(lat, lng)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_districts_bbox ON districts(min_lat, max_lat, min_lng, max_lng)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_regencies_lat_lng ON regencies(lat, lng)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_regencies_bbox ON regencies(min_lat, max_lat, min_lng, max_lng)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_provinces_lat_lng ON provinces(lat, lng)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_provinces_bbox ON provinces(min_lat, max_lat, min_lng, max_lng)')
     
     conn.commit()
 
-def process_geojson(filepath):
+def hilbert_key(lat, lng):
+    # Posisi titik pada kurva Hilbert di atas grid 2^HILBERT_ORDER x 2^HILBERT_ORDER
+    # yang menutupi seluruh bumi. Titik yang berdekatan mendapat key yang berdekatan.
+    n = 1 << HILBERT_ORDER
+    x = int((lng + 180) / 360 * (n - 1))
+    y = int((lat + 90) / 180 * (n - 1))
+    d = 0
+    s = n >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x = n - 1 - x
+                y = n - 1 - y
+            x, y = y, x
+        s >>= 1
+    return d
+
+def populate_rtrees(conn):
+    # R*Tree diisi sekali di akhir dari tabel yang sudah lengkap (satu
+    # INSERT ... SELECT per level), bukan baris per baris saat bulk insert.
+    # Baris dimasukkan urut kurva Hilbert dari titik tengah bbox, sehingga
+    # node R*Tree berisi area yang berdekatan (mendekati packing STR)
+    conn.create_function('hilbert_key', 2, hilbert_key, deterministic=True)
+    cursor = conn.cursor()
+    cursor.execute('BEGIN')
+    for table_name in ('provinces', 'regencies', 'districts', 'villages'):
+        cursor.execute(f'''
+        INSERT INTO {table_name}_rtree (id, min_lat, max_lat, min_lng, max_lng)
+        SELECT rowid, min_lat, max_lat, min_lng, max_lng FROM {table_name}
+        ORDER BY hilbert_key((min_lat + max_lat) / 2, (min_lng + max_lng) / 2)
+        ''')
+    conn.commit()
+
+def build_polygon(rings):
+    # Hole dibuat satu per satu sebagai LinearRing: jumlah titik tiap hole
+    # bisa berbeda, jadi tidak bisa disusun menjadi satu array numpy
+    shell, *holes = build_polygon_rings(rings)
+    holes = [shapely.linearrings(ring) for ring in holes]
+    return shapely.polygons(shell, holes=holes or None)
+
+def build_geometry(geometry):
+    # Bangun geometry langsung dari array koordinat dengan constructor
+    # vectorized shapely 2 (di C), tanpa menelusuri dict seperti shape()
+    geom_type = geometry['type']
+    if geom_type == 'Polygon':
+        return build_polygon(geometry['coordinates'])
+    if geom_type == 'MultiPolygon':
+        return shapely.multipolygons([build_polygon(p) for p in geometry['coordinates']])
+    return shape(geometry)
+
+def build_ring(coords):
+    # Validasi sama seperti GEOS: ring minimal 4 titik, tiap titik minimal [lng, lat]
     try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-            
-        # Kadang berupa FeatureCollection, kadang langsung Feature
-        if data.get('type') == 'FeatureCollection' and 'features' in data and len(data['features']) > 0:
-            feature = data['features'][0]
-        elif data.get('type') == 'Feature':
-            feature = data
-        else:
-            print(f"Format GeoJSON tidak dikenali di {filepath}")
-            return None
-            
-        geom = shape(feature['geometry'])
-        
-        # Simplifikasi polygon (Ramer-Douglas-Peucker)
-        # tolerance dalam derajat. 0.0000009 setara dengan ~10cm di khatulistiwa
-        simplified_geom = geom.simplify(SIMPLIFY_TOLERANCE, preserve_topology=True)
-        
-        # Hitung centroid
-        centroid = simplified_geom.centroid
-        lat, lng = centroid.y, centroid.x
-        
-        # Hitung bounding box (min_lng, min_lat, max_lng, max_lat)
-        min_lng, min_lat, max_lng, max_lat = simplified_geom.bounds
+        ring = np.asarray(coords, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("Ring tidak valid (titik tidak seragam)") from None
+    if ring.ndim != 2 or ring.shape[0] < 1 or ring.shape[1] < 2:
+        raise ValueError(f"Ring tidak valid (shape {ring.shape})")
+    ring = ring[:, :2]
+    # Ring yang belum tertutup ditutup dengan titik pertama, seperti yang
+    # dilakukan GEOS/shape(). WKB hasil jalur numba juga harus tertutup
+    if (ring[0] != ring[-1]).any():
+        ring = np.vstack([ring, ring[:1]])
+    if len(ring) < 4:
+        raise ValueError(f"Ring tidak valid ({len(ring)} titik)")
+    return ring
+
+def build_polygon_rings(rings):
+    # Satu polygon GeoJSON -> list ring (ndarray N x 2), ring pertama shell
+    if not isinstance(rings, (list, tuple)) or not rings:
+        raise ValueError("Polygon tanpa ring")
+    return [build_ring(ring) for ring in rings]
+
+def build_rings(geometry):
+    # Polygon / MultiPolygon -> (is_multi, list polygon), tiap polygon
+    # berupa list ring (ndarray N x 2) dengan ring pertama sebagai shell
+    if geometry['type'] == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        return None
+    is_multi = geometry['type'] == 'MultiPolygon'
+    return is_multi, [build_polygon_rings(rings) for rings in polygons]
+
+def rings_to_geometry(is_multi, polygons):
+    parts = [build_polygon(rings) for rings in polygons]
+    return shapely.multipolygons(parts) if is_multi else parts[0]
+
+if njit is not None:
+    @njit(cache=True)
+    def rdp_mask(xy, tolerance):
+        # Douglas-Peucker iteratif (pakai stack), True = titik dipertahankan
+        n = xy.shape[0]
+        keep = np.zeros(n, dtype=np.bool_)
+        keep[0] = True
+        keep[n - 1] = True
+        stack = np.empty((n, 2), dtype=np.int64)
+        stack[0, 0] = 0
+        stack[0, 1] = n - 1
+        top = 1
+        tolerance_sq = tolerance * tolerance
+        while top > 0:
+            top -= 1
+            start = stack[top, 0]
+            end = stack[top, 1]
+            ax = xy[start, 0]
+            ay = xy[start, 1]
+            dx = xy[end, 0] - ax
+            dy = xy[end, 1] - ay
+            seg_sq = dx * dx + dy * dy
+            max_sq = -1.0
+            index = start
+            for i in range(start + 1, end):
+                px = xy[i, 0] - ax
+                py = xy[i, 1] - ay
+                # Jarak ke segmen (bukan ke garis tak hingga), sama seperti GEOS
+                if seg_sq > 0.0:
+                    t = (px * dx + py * dy) / seg_sq
+                    if t < 0.0:
+                        t = 0.0
+                    elif t > 1.0:
+                        t = 1.0
+                    px -= t * dx
+                    py -= t * dy
+                dist_sq = px * px + py * py
+                if dist_sq > max_sq:
+                    max_sq = dist_sq
+                    index = i
+            if max_sq > tolerance_sq:
+                keep[index] = True
+                if index - start > 1:
+                    stack[top, 0] = start
+                    stack[top, 1] = index
+                    top += 1
+                if end - index > 1:
+                    stack[top, 0] = index
+                    stack[top, 1] = end
+                    top += 1
+        return keep
+
+    @njit(cache=True)
+    def ring_stats(xy, ox, oy):
+        # Satu pass per ring: luas bertanda + momen pertama (rumus shoelace,
+        # relatif ke titik (ox, oy) supaya presisi float tetap terjaga)
+        # sekaligus bounding box-nya
+        n = xy.shape[0]
+        area = 0.0
+        mx = 0.0
+        my = 0.0
+        min_x = max_x = xy[0, 0]
+        min_y = max_y = xy[0, 1]
+        for i in range(n):
+            j = (i + 1) % n
+            x0 = xy[i, 0] - ox
+            y0 = xy[i, 1] - oy
+            x1 = xy[j, 0] - ox
+            y1 = xy[j, 1] - oy
+            cross = x0 * y1 - x1 * y0
+            area += cross
+            mx += (x0 + x1) * cross
+            my += (y0 + y1) * cross
+            min_x = min(min_x, xy[i, 0])
+            max_x = max(max_x, xy[i, 0])
+            min_y = min(min_y, xy[i, 1])
+            max_y = max(max_y, xy[i, 1])
+        return area / 2.0, mx / 6.0, my / 6.0, min_x, min_y, max_x, max_y
+
+def polygon_wkb(rings):
+    # WKB Polygon little-endian: byte order, type 3, jumlah ring,
+    # lalu per ring jumlah titik + koordinat float64
+    parts = [struct.pack('<BII', 1, 3, len(rings))]
+    for ring in rings:
+        parts.append(struct.pack('<I', len(ring)))
+        parts.append(ring.astype('<f8').tobytes())
+    return b''.join(parts)
+
+def multipolygon_wkb(polygons):
+    # WKB MultiPolygon: header type 6 + jumlah polygon, diikuti WKB tiap polygon
+    return struct.pack('<BII', 1, 6, len(polygons)) + b''.join(map(polygon_wkb, polygons))
+
+def geometry_polygons(geom):
+    # Geometry shapely -> list polygon, tiap polygon list ring (ndarray N x 2).
+    # Format qdelta hanya untuk area; tipe lain (Point, LineString, ...)
+    # ditolak dengan ValueError supaya tercatat sebagai file yang gagal
+    if geom.geom_type not in ('Polygon', 'MultiPolygon') or geom.is_empty:
+        kind = f"{geom.geom_type} kosong" if geom.is_empty else geom.geom_type
+        raise ValueError(f"Geometry {kind} tidak didukung format qdelta")
+    return [
+        [np.asarray(polygon.exterior.coords)[:, :2]] + [np.asarray(ring.coords)[:, :2] for ring in polygon.interiors]
+        for polygon in getattr(geom, 'geoms', [geom])
+    ]
+
+def encode_boundaries(is_multi, polygons):
+    if BOUNDARY_FORMAT == 'qdelta':
+        return boundary_codec.encode(polygons)
+    return multipolygon_wkb(polygons) if is_multi else polygon_wkb(polygons[0])
+
+def simplify_rings(rings):
+    simplified = []
+    for ring in rings:
+        ring = ring[rdp_mask(ring, SIMPLIFY_TOLERANCE)]
+        if len(ring) < 4:
+            if not simplified:
+                # Shell kolaps, polygon ini hilang
+                return None
+            # Hole yang kolaps dibuang
+            continue
+        simplified.append(ring)
+    return simplified
+
+def measure_rings(is_multi, polygons):
+    # Simplifikasi + centroid + bbox + WKB tanpa GEOS.
+    # Return None jika semua shell kolaps, biar ditangani jalur GEOS.
+    simplified = [rings for rings in map(simplify_rings, polygons) if rings]
+    if not simplified:
+        return None
+    
+    # Centroid luas: shell dihitung positif, hole negatif (apapun orientasinya).
+    # Bounding box cukup dari shell, diambil dari pass yang sama
+    ox, oy = simplified[0][0][0].tolist()
+    area = mx = my = 0.0
+    min_lng = min_lat = float('inf')
+    max_lng = max_lat = float('-inf')
+    for rings in simplified:
+        for i, ring in enumerate(rings):
+            ring_area, ring_mx, ring_my, x0, y0, x1, y1 = ring_stats(ring, ox, oy)
+            if (ring_area < 0) == (i == 0):
+                ring_area, ring_mx, ring_my = -ring_area, -ring_mx, -ring_my
+            area += ring_area
+            mx += ring_mx
+            my += ring_my
+            if i == 0:
+                min_lng, min_lat = min(min_lng, x0), min(min_lat, y0)
+                max_lng, max_lat = max(max_lng, x1), max(max_lat, y1)
+    if area > 0:
+        lng, lat = ox + mx / area, oy + my / area
+    else:
+        lng, lat = (min_lng + max_lng) / 2, (min_lat + max_lat) / 2
+    
+    return (lat, lng, min_lat, max_lat, min_lng, max_lng), encode_boundaries(is_multi, simplified)
+
+def measure_geometries(geoms, preserve_topology):
+    # Semua operasi GEOS dijalankan sekali per batch (array geometry),
+    # bukan satu panggilan Python -> GEOS per file
+    
+    # Simplifikasi polygon (Ramer-Douglas-Peucker)
+    # tolerance dalam derajat. 0.0000009 setara dengan ~10cm di khatulistiwa
+    # preserve_topology=False memakai GEOSSimplify biasa yang jauh lebih cepat
+    geoms = np.array(geoms, dtype=object)
+    simplified = shapely.simplify(geoms, SIMPLIFY_TOLERANCE, preserve_topology=preserve_topology)
+    if not preserve_topology:
+        # Polygon yang sangat kecil bisa kolaps menjadi kosong,
+        # ulangi yang kosong dengan versi topology-preserving
+        collapsed = shapely.is_empty(simplified)
+        if collapsed.any():
+            simplified[collapsed] = shapely.simplify(geoms[collapsed], SIMPLIFY_TOLERANCE, preserve_topology=True)
+    
+    # Hitung centroid dan bounding box (min_lng, min_lat, max_lng, max_lat),
+    # disusun sebagai array N x 6 sesuai COORD_FIELDS
+    centroids = shapely.centroid(simplified)
+    bounds = shapely.bounds(simplified)
+    coords = np.column_stack([
+        shapely.get_y(centroids), shapely.get_x(centroids),
+        bounds[:, 1], bounds[:, 3], bounds[:, 0], bounds[:, 2],
+    ])
+    
+    # Konversi ke WKB Binary (atau format terkuantisasi)
+    if BOUNDARY_FORMAT == 'qdelta':
+        wkbs = [boundary_codec.encode(geometry_polygons(geom)) for geom in simplified]
+    else:
+        wkbs = shapely.to_wkb(simplified).tolist()
+    
+    return coords, wkbs
+
+# Error yang berasal dari file/data (bukan bug kode): file tidak terbaca,
+# JSON rusak (JSONDecodeError turunan ValueError), GeoJSON/ring yang tidak
+# valid (ValueError dari load_feature dan build_ring), dan geometry yang
+# ditolak GEOS.
+LOAD_ERRORS = (OSError, ValueError, GEOSException)
+
+# Tipe geometry GeoJSON (RFC 7946) yang bisa dibaca
+GEOMETRY_TYPES = (
+    'Point', 'MultiPoint', 'LineString', 'MultiLineString',
+    'Polygon', 'MultiPolygon', 'GeometryCollection',
+)
+
+def load_feature(filepath, use_rings=False):
+    # Unbuffered: satu read() langsung ke bytes, tanpa lapisan buffer/codec
+    with open(filepath, 'rb', buffering=0) as f:
+        data = json_loads(f.read())
         
-        # Konversi ke WKB Binary
-        wkb = wkb_dumps(simplified_geom)
+    # Kadang berupa FeatureCollection, kadang langsung Feature
+    doc_type = data.get('type') if isinstance(data, dict) else None
+    if doc_type == 'FeatureCollection' and isinstance(data.get('features'), list) and data['features']:
+        feature = data['features'][0]
+    elif doc_type == 'Feature':
+        feature = data
+    else:
+        raise ValueError("Format GeoJSON tidak dikenali")
+    if not isinstance(feature, dict):
+        raise ValueError("Feature harus berupa object")
+    
+    # geometry dan properties boleh null menurut RFC 7946, tapi file tanpa
+    # geometry tidak punya batas wilayah, jadi ikut dicatat sebagai gagal
+    geometry = feature.get('geometry')
+    if not isinstance(geometry, dict):
+        raise ValueError("Feature tidak punya geometry")
+    geom_type = geometry.get('type')
+    members = geometry.get('geometries' if geom_type == 'GeometryCollection' else 'coordinates')
+    if geom_type not in GEOMETRY_TYPES or not isinstance(members, list) or not members:
+        raise ValueError(f"Geometry {geom_type} tidak valid atau kosong")
+    
+    props = feature.get('properties')
+    if props is None:
+        props = {}
+    elif not isinstance(props, dict):
+        raise ValueError("properties harus berupa object atau null")
+    name = props.get('name') or ''
+    if not isinstance(name, str):
+        raise ValueError("properties.name harus berupa string")
         
-        # Ekstrak properties
-        filename = os.path.basename(filepath)
-        code = filename.replace('.geojson', '')
+    geom = build_rings(geometry) if use_rings else None
+    if geom is None:
+        geom = build_geometry(geometry)
+    
+    # Ekstrak properties
+    filename = os.path.basename(filepath)
+    code = filename.replace('.geojson', '')
 
-        props = feature.get('properties', {})
-        name = props.get('name', '')
+    # Fallback jika id ada di properties
+    if not code and 'code' in props:
+         code = props['code']
+    
+    return code, name, geom
 
-        # Normalkan nama menjadi Title Case (misal: "JAWA BARAT" -> "Jawa Barat")
-        if name:
-            name = name.title()
+APOSTROPHE_RE = re.compile(r"'(\w)")
 
-        # Fallback jika id ada di properties
-        if not code and 'code' in props:
-             code = props['code']
-        
-        return {
-            'id': code,
-            'name': name,
-            'lat': lat,
-            'lng': lng,
-            'min_lat': min_lat,
-            'max_lat': max_lat,
-            'min_lng': min_lng,
-            'max_lng': max_lng,
-            'boundaries': wkb
-        }
-    except Exception as e:
-        print(f"Error processing {filepath}: {e}")
-        return None
+def title_names(names):
+    # Normalkan nama menjadi Title Case (misal: "JAWA BARAT" -> "Jawa Barat").
+    # Satu kali title() untuk seluruh batch: nama digabung, diproses, lalu dipecah lagi.
+    # str.title() menganggap apostrof sebagai batas kata ("JUM'AT" -> "Jum'At"),
+    # jadi huruf setelah apostrof dikembalikan ke huruf kecil
+    if not names:
+        return names
+    joined = '\0'.join(names).title()
+    joined = APOSTROPHE_RE.sub(lambda match: "'" + match.group(1).lower(), joined)
+    return joined.split('\0')
 
-def process_level(conn, level_dir, table_name, has_parent=True):
+def measure_features(filepaths, preserve_topology):
+    # Douglas-Peucker biasa (tanpa preserve_topology) bisa dijalankan
+    # langsung pada array koordinat dengan numba jika tersedia
+    use_rings = njit is not None and not preserve_topology
+    
+    # Hasil dalam bentuk kolom (SoA): 6 float per baris disimpan rata di
+    # satu array('d'), bukan tuple per baris. Lebih kecil juga saat di-pickle
+    # dari worker ke process utama.
+    ids, names, coords, wkbs = [], [], array('d'), []
+    geos_features = []
+    for path in filepaths:
+        code, name, geom = load_feature(path, use_rings)
+        if isinstance(geom, tuple):
+            measured = measure_rings(*geom)
+            if measured is not None:
+                ids.append(code)
+                names.append(name)
+                coords.extend(measured[0])
+                wkbs.append(measured[1])
+                continue
+            geom = rings_to_geometry(*geom)
+        geos_features.append((code, name, geom))
+    
+    if geos_features:
+        codes, geos_names, geoms = zip(*geos_features)
+        geos_coords, geos_wkbs = measure_geometries(geoms, preserve_topology)
+        ids.extend(codes)
+        names.extend(geos_names)
+        coords.frombytes(geos_coords.astype(np.float64).tobytes())
+        wkbs.extend(geos_wkbs)
+    return ids, names, coords, wkbs
+
+def process_batch(filepaths, preserve_topology=True):
+    # Jalur cepat tanpa try/except per file. Jika ada file yang bermasalah
+    # (saat dibaca maupun saat simplifikasi/pengukuran), batch diulang per
+    # file untuk memisahkan file yang gagal.
+    # Error lain (bug) tetap dilempar supaya tidak hilang diam-diam.
+    try:
+        ids, names, coords, wkbs = measure_features(filepaths, preserve_topology)
+        failures = []
+    except LOAD_ERRORS:
+        ids, names, coords, wkbs, failures = [], [], array('d'), [], []
+        for path in filepaths:
+            try:
+                file_ids, file_names, file_coords, file_wkbs = measure_features([path], preserve_topology)
+            except LOAD_ERRORS as e:
+                failures.append((path, f"{type(e).__name__}: {e}"))
+                continue
+            ids.extend(file_ids)
+            names.extend(file_names)
+            coords.extend(file_coords)
+            wkbs.extend(file_wkbs)
+    return ids, title_names(names), coords, wkbs, failures
+
+def produce_batch(results_queue, filepaths, preserve_topology):
+    results_queue.put(process_batch(filepaths, preserve_topology))
+
+def parent_id(code):
+    # Parent ID adalah ID dikurangi bagian terakhir
+    # Contoh: 32.12.02.2007 -> parent_id = 32.12.02
+    i = code.rfind('.')
+    return code[:i] if i >= 0 else None
+
+def process_level(conn, level_dir, table_name, has_parent=True, preserve_topology=True):
     cursor = conn.cursor()
-    files = glob.glob(os.path.join(DATA_DIR, level_dir, '*.geojson'))
+    # Urut nama file = urut id (NN.NN.NN.NNNN), jadi insert mendekati urutan primary key
+    files = sorted(glob.glob(os.path.join(DATA_DIR, level_dir, '*.geojson')))
     total_files = len(files)
     
     print(f"Processing {total_files} files in {level_dir}...")
     
+    # SQL dan bentuk tuple per baris ditentukan sekali per level,
+    # bukan dievaluasi ulang di setiap batch.
+    # Cukup INSERT biasa: nama file unik per level dan database selalu
+    # dibuat ulang, jadi tidak perlu cek baris lama seperti INSERT OR REPLACE
+    if has_parent:
+        sql = f'''
+        INSERT INTO {table_name} 
+        (id, name, parent_id, lat, lng, min_lat, max_lat, min_lng, max_lng, boundaries)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        
+        def make_rows(ids, names, coords, wkbs):
+            return zip(ids, names, map(parent_id, ids), *(coords[i::6] for i in range(6)), wkbs)
+    else:
+        sql = f'''
+        INSERT INTO {table_name} 
+        (id, name, lat, lng, min_lat, max_lat, min_lng, max_lng, boundaries)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        
+        def make_rows(ids, names, coords, wkbs):
+            return zip(ids, names, *(coords[i::6] for i in range(6)), wkbs)
+    
     count = 0
+    errors = []
+    failures = []
     
-    # Kumpulkan data dalam batch untuk insert lebih cepat
-    batch = []
-    
-    for filepath in files:
-        data = process_geojson(filepath)
-        if data:
-            if has_parent:
-                # Parent ID adalah ID dikurangi bagian terakhir
-                # Contoh: 32.12.02.2007 -> parent_id = 32.12.02
-                parts = data['id'].split('.')
-                parent_id = '.'.join(parts[:-1]) if len(parts) > 1 else None
-                
-                batch.append((data['id'], data['name'], parent_id, data['lat'], data['lng'], 
-                      data['min_lat'], data['max_lat'], data['min_lng'], data['max_lng'], data['boundaries']))
-            else:
-                batch.append((data['id'], data['name'], data['lat'], data['lng'], 
-                      data['min_lat'], data['max_lat'], data['min_lng'], data['max_lng'], data['boundaries']))
-            
-            count += 1
-            if count % 1000 == 0:
-                print(f"Processed {count}/{total_files}...")
-                
-                if has_parent:
-                     cursor.executemany(f'''
-                     INSERT OR REPLACE INTO {table_name} 
-                     (id, name, parent_id, lat, lng, min_lat, max_lat, min_lng, max_lng, boundaries)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                     ''', batch)
-                else:
-                     cursor.executemany(f'''
-                     INSERT OR REPLACE INTO {table_name} 
-                     (id, name, lat, lng, min_lat, max_lat, min_lng, max_lng, boundaries)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                     ''', batch)
-                     
-                conn.commit()
-                batch = []
+    # Kumpulkan data dalam batch (per kolom) untuk insert lebih cepat
+    batch_ids, batch_names, batch_coords, batch_wkbs = [], [], array('d'), []
+    
+    def flush():
+        # Baris dirangkai dengan zip langsung di executemany, tanpa list tuple
+        cursor.executemany(sql, make_rows(batch_ids, batch_names, batch_coords, batch_wkbs))
+        batch_ids.clear()
+        batch_names.clear()
+        del batch_coords[:]
+        batch_wkbs.clear()
+    
+    def write_results(results_queue):
+        # Thread penulis: satu-satunya yang menyentuh SQLite selama level ini
+        nonlocal count
+        item = None
+        try:
+            while True:
+                item = results_queue.get()
+                if item is SENTINEL:
+                    break
+                ids, names, coords, wkbs, batch_failures = item
+                failures.extend(batch_failures)
+                batch_ids.extend(ids)
+                batch_names.extend(names)
+                batch_coords.extend(coords)
+                batch_wkbs.extend(wkbs)
                 
-    # Insert sisa batch
-    if batch:
-         if has_parent:
-             cursor.executemany(f'''
-             INSERT OR REPLACE INTO {table_name} 
-             (id, name, parent_id, lat, lng, min_lat, max_lat, min_lng, max_lng, boundaries)
-             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-             ''', batch)
-         else:
-             cursor.executemany(f'''
-             INSERT OR REPLACE INTO {table_name} 
-             (id, name, lat, lng, min_lat, max_lat, min_lng, max_lng, boundaries)
-             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-             ''', batch)
-         conn.commit()
+                count += len(ids)
+                if len(batch_ids) >= 1000:
+                    print(f"Processed {count}/{total_files}...")
+                    flush()
+                    
+            # Insert sisa batch
+            if batch_ids:
+                flush()
+        except Exception as e:
+            errors.append(e)
+            # Antrean tetap dikosongkan (hasilnya dibuang) sampai SENTINEL.
+            # Tanpa ini worker tertahan di put() pada antrean yang penuh
+            # dan pool.join() tidak pernah selesai
+            while item is not SENTINEL:
+                item = results_queue.get()
+
+    # Satu transaksi untuk seluruh level; batch 1000 baris hanya untuk
+    # membatasi memori, bukan untuk commit
+    cursor.execute('BEGIN')
+    
+    # Pipeline 2 tahap: worker process mem-parsing + simplifikasi lalu
+    # mengirim hasil lewat antrean, sementara thread penulis di process utama
+    # meng-insert ke SQLite (single writer). CPU dan I/O disk jadi tumpang tindih.
+    # Antrean dibatasi supaya worker menunggu jika penulis tertinggal.
+    # Level kecil (provinsi, kabupaten) dipecah lebih halus supaya setiap
+    # worker tetap kebagian file, bukan semuanya jatuh ke satu batch
+    workers = os.cpu_count()
+    chunk_size = max(1, min(BATCH_SIZE, math.ceil(total_files / workers)))
+    chunks = [files[i:i + chunk_size] for i in range(0, total_files, chunk_size)]
+    with multiprocessing.Manager() as manager, multiprocessing.Pool(workers) as pool:
+        results_queue = manager.Queue(maxsize=4 * workers)
+        writer = threading.Thread(target=write_results, args=(results_queue,))
+        writer.start()
+        
+        for chunk in chunks:
+            pool.apply_async(produce_batch, (results_queue, chunk, preserve_topology), error_callback=errors.append)
+        pool.close()
+        pool.join()
+        
+        results_queue.put(SENTINEL)
+        writer.join()
+    
+    if errors:
+        raise errors[0]
+    
+    conn.commit()
          
     print(f"Finished processing {level_dir}. Total inserted: {count}")
+    if failures:
+        print(f"Failed to process {len(failures)} files in {level_dir}:")
+        for path, error in sorted(failures):
+            print(f"  {path}: {error}")
 
 def main():
     if os.path.exists(DB_FILE):
@@ -224,20 +674,45 @@ def main():
         os.remove(DB_FILE)
         
     print(f"Creating new database {DB_FILE}...")
-    conn = sqlite3.connect(DB_FILE)
-    
+    # Insert dilakukan oleh thread penulis di process_level
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+
+    # Database dibuat ulang dari nol setiap run, jadi durability tidak penting.
+    # Matikan journal & fsync supaya bulk insert tidak tertahan I/O.
+    # page_size harus diset sebelum tabel pertama dibuat.
+    conn.execute("PRAGMA page_size=8192")
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MB
+    conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+
     try:
-        init_db(conn)
+        init_db_tables(conn)
         
-        # Proses secara berurutan agar relasi parent terjamin
+        # Proses secara berurutan agar relasi parent terjamin.
+        # Batas provinsi/kabupaten tetap topology-preserving; kecamatan dan
+        # desa (mayoritas file) memakai simplifikasi yang lebih cepat
         process_level(conn, 'provinces', 'provinces', has_parent=False)
         process_level(conn, 'regencies', 'regencies', has_parent=True)
-        process_level(conn, 'districts', 'districts', has_parent=True)
-        process_level(conn, 'villages', 'villages', has_parent=True)
+        process_level(conn, 'districts', 'districts', has_parent=True, preserve_topology=False)
+        process_level(conn, 'villages', 'villages', has_parent=True, preserve_topology=False)
+        
+        print("Creating indexes...")
+        create_indexes(conn)
+        
+        print("Populating R*Tree indexes...")
+        populate_rtrees(conn)
         
         print("Database creation completed successfully.")
     except Exception as e:
+        # Error di sini adalah bug (error data sudah dicatat per file), jadi
+        # build dihentikan dengan exit code non-zero. Database setengah jadi
+        # dihapus supaya tidak ikut dipakai server API
         print(f"An error occurred: {e}")
+        conn.close()
+        os.remove(DB_FILE)
+        raise
     finally:
         conn.close()
 
@@ -22,6 +22,8 @@ const DB_DOWNLOAD_URL: &str = "https://github.com/agusibrahim/indonesian-geocode
 #[derive(Clone)]
 struct AppState {
     db: Pool<Sqlite>,
+    // false untuk database lama (sebelum ada R*Tree), misal hasil download
+    has_rtree: bool,
 }
 
 // Request Models
@@ -99,7 +101,15 @@ async fn main() -> anyhow::Result<()> {
         .connect_with(db_options)
         .await?;
 
-    let state = Arc::new(AppState { db: pool });
+    let has_rtree = sqlx::query("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'villages_rtree'")
+        .fetch_optional(&pool)
+        .await?
+        .is_some();
+    if !has_rtree {
+        tracing::warn!("Table villages_rtree not found, reverse geocode will scan villages bounding boxes");
+    }
+
+    let state = Arc::new(AppState { db: pool, has_rtree });
 
     let app = Router::new()
         .route("/api/v1/geocode/reverse", get(reverse_geocode))
@@ -168,19 +178,36 @@ async fn reverse_geocode(
     let lng = params.lng;
     let user_point = Point::new(lng, lat);
 
-    let query = r#"
-        SELECT v.id, v.name as village_name,
-               d.name as district_name, r.name as regency_name, p.name as province_name,
-               v.lat, v.lng, v.boundaries
-        FROM villages v
-        LEFT JOIN districts d ON v.parent_id = d.id
-        LEFT JOIN regencies r ON d.parent_id = r.id
-        LEFT JOIN provinces p ON r.parent_id = p.id
-        WHERE ? BETWEEN v.min_lat AND v.max_lat
-          AND ? BETWEEN v.min_lng AND v.max_lng
-    "#;
-
-    match sqlx::query(query).bind(lat).bind(lng).fetch_all(&state.db).await {
+    let result = if state.has_rtree {
+        let query = r#"
+            SELECT v.id, v.name as village_name,
+                   d.name as district_name, r.name as regency_name, p.name as province_name,
+                   v.lat, v.lng, v.boundaries
+            FROM villages_rtree vr
+            JOIN villages v ON v.rowid = vr.id
+            LEFT JOIN districts d ON v.parent_id = d.id
+            LEFT JOIN regencies r ON d.parent_id = r.id
+            LEFT JOIN provinces p ON r.parent_id = p.id
+            WHERE vr.min_lat <= ? AND vr.max_lat >= ?
+              AND vr.min_lng <= ? AND vr.max_lng >= ?
+        "#;
+        sqlx::query(query).bind(lat).bind(lat).bind(lng).bind(lng).fetch_all(&state.db).await
+    } else {
+        let query = r#"
+            SELECT v.id, v.name as village_name,
+                   d.name as district_name, r.name as regency_name, p.name as province_name,
+                   v.lat, v.lng, v.boundaries
+            FROM villages v
+            LEFT JOIN districts d ON v.parent_id = d.id
+            LEFT JOIN regencies r ON d.parent_id = r.id
+            LEFT JOIN provinces p ON r.parent_id = p.id
+            WHERE ? BETWEEN v.min_lat AND v.max_lat
+              AND ? BETWEEN v.min_lng AND v.max_lng
+        "#;
+        sqlx::query(query).bind(lat).bind(lng).fetch_all(&state.db).await
+    };
+
+    match result {
         Ok(rows) => {
             for row in rows {
                 let wkb_data: Vec<u8> = row.get("boundaries");